@@ -3,16 +3,22 @@ import os
 import sys
 import time
 import random
+import concurrent.futures
 import pygame
 import chess
 import chess.engine
+import chess.polyglot
 
 
 ENGINE_PATH = os.path.join("engine", "stockfish-windows-x86-64-avx2.exe")
 BOARD_SIZE = 640  
 SQUARE_SIZE = BOARD_SIZE // 8
-FPS = 60
 INFO_HEIGHT = 120  
+HISTORY_WRAP = 80
+EVENT_WAIT_MS = 250
+AI_TICK_MS = 200
+AI_TICK_EVENT = pygame.USEREVENT + 1
+BOARD_FRAME_CACHE_SIZE = 4
 
 
 LIGHT = (240, 217, 181)
@@ -28,10 +34,30 @@ pygame.init()
 pygame.font.init()
 FONT = pygame.font.SysFont("DejaVuSans", 36, bold=True)
 SMALL_FONT = pygame.font.SysFont("DejaVuSans", 18)
-WIN = pygame.display.set_mode((BOARD_SIZE, BOARD_SIZE + INFO_HEIGHT))
+# SCALED presents through the SDL renderer, so any upscaling for high-DPI desktops happens on the GPU
+WIN = pygame.display.set_mode((BOARD_SIZE, BOARD_SIZE + INFO_HEIGHT), pygame.SCALED)
 pygame.display.set_caption("Play vs Stockfish - Click to move | ← back  → forward  ↓ live  R reset")
 
 
+BOARD_BG = pygame.Surface((BOARD_SIZE, BOARD_SIZE)).convert()
+for r in range(8):
+    for c in range(8):
+        color = LIGHT if (r + c) % 2 == 0 else DARK
+        pygame.draw.rect(BOARD_BG, color, (c * SQUARE_SIZE, r * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+
+# highlight sprites are rasterised once and blitted per square
+DOT_RADIUS = 10
+DOT = pygame.Surface((DOT_RADIUS * 2, DOT_RADIUS * 2), pygame.SRCALPHA)
+pygame.draw.circle(DOT, HIGHLIGHT, (DOT_RADIUS, DOT_RADIUS), DOT_RADIUS)
+DOT = DOT.convert_alpha()
+LAST_MOVE_FRAME = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+pygame.draw.rect(LAST_MOVE_FRAME, LAST_MOVE_COL, (0, 0, SQUARE_SIZE, SQUARE_SIZE), 4)
+LAST_MOVE_FRAME = LAST_MOVE_FRAME.convert_alpha()
+SELECT_FRAME = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+pygame.draw.rect(SELECT_FRAME, SELECT_COL, (0, 0, SQUARE_SIZE, SQUARE_SIZE), 4)
+SELECT_FRAME = SELECT_FRAME.convert_alpha()
+
+
 PIECE_IMAGES = {}
 PIECE_FOLDER = "pieces"
 key_map = {'pawn':'p','knight':'n','bishop':'b','rook':'r','queen':'q','king':'k'}
@@ -42,10 +68,15 @@ for color in ["white", "black"]:
         if os.path.exists(path):
             img = pygame.image.load(path)
             key = color[0] + key_map[piece]
-            PIECE_IMAGES[key] = pygame.transform.smoothscale(img, (SQUARE_SIZE, SQUARE_SIZE))
+            PIECE_IMAGES[key] = pygame.transform.smoothscale(img, (SQUARE_SIZE, SQUARE_SIZE)).convert_alpha()
         else:
             print("Missing image:", path)
 
+# keyed by chess.Piece.symbol(): uppercase for white, lowercase for black
+SYMBOL_TO_IMAGE = {}
+for key, img in PIECE_IMAGES.items():
+    SYMBOL_TO_IMAGE[key[1].upper() if key[0] == 'w' else key[1]] = img
+
 
 try:
     level = int(input("Choose Stockfish difficulty (1-20), Enter for default 5: ") or 5)
@@ -56,6 +87,7 @@ print("Skill level set to", level)
 
 engine = None
 time_per_move = max(0.05, 0.05 + level * 0.07)
+ai_limit = chess.engine.Limit(time=time_per_move)
 if os.path.exists(ENGINE_PATH):
     try:
         engine = chess.engine.SimpleEngine.popen_uci(ENGINE_PATH)
@@ -66,6 +98,11 @@ if os.path.exists(ENGINE_PATH):
                 engine.configure({'UCI_LimitStrength': True, 'UCI_Elo': 800 + level * 100})
             except Exception:
                 pass
+        try:
+            tuning = {'Threads': max(1, (os.cpu_count() or 2) // 2), 'Hash': 128, 'Move Overhead': 10}
+            engine.configure({name: value for name, value in tuning.items() if name in engine.options})
+        except Exception:
+            pass
         print("Stockfish launched:", ENGINE_PATH)
     except Exception as e:
         print("Failed to start engine, falling back to random AI. Error:", e)
@@ -77,11 +114,22 @@ else:
 board = chess.Board()
 move_history = []
 history_pointer = 0
+history_text = ""
+history_line_surfs = []
 selected_square = None
+selected_piece = None
 legal_moves_for_sel = []
+legal_move_set = set()
+legal_moves_by_from = {}
+position_outcome = None
+position_hash = None
+board_frame_cache = {}
 last_player_move_time = None
 ai_is_thinking = False
+ai_future = None
+ai_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 human_color = chess.WHITE
+dirty = True
 
 
 def square_to_pixel(sq):
@@ -91,6 +139,10 @@ def square_to_pixel(sq):
     y = (7 - rank) * SQUARE_SIZE
     return x, y
 
+# draw_board indexes these per square instead of calling square_to_pixel
+SQ_XY = tuple(square_to_pixel(sq) for sq in chess.SQUARES)
+SQ_DOT_XY = tuple((x + SQUARE_SIZE//2 - DOT_RADIUS, y + SQUARE_SIZE//2 - DOT_RADIUS) for x, y in SQ_XY)
+
 def pixel_to_square(pos):
     x, y = pos
     if x < 0 or y < 0 or x >= BOARD_SIZE or y >= BOARD_SIZE:
@@ -100,109 +152,162 @@ def pixel_to_square(pos):
     rank = 7 - row
     return chess.square(int(col), int(rank))
 
+def refresh_position_cache():
+    # run move generation once per position instead of on every click
+    global legal_move_set, legal_moves_by_from, position_outcome, position_hash
+    legal_move_set = set(board.legal_moves)
+    position_outcome = board.outcome()
+    position_hash = chess.polyglot.zobrist_hash(board)
+    legal_moves_by_from = {}
+    for mv in legal_move_set:
+        legal_moves_by_from.setdefault(mv.from_square, []).append(mv)
+
 def update_board_from_history():
-    global board
-    board = chess.Board()
-    for mv in move_history[:history_pointer]:
+    # step from the current ply with pop/push instead of replaying the whole game
+    global dirty
+    while len(board.move_stack) > history_pointer:
+        board.pop()
+    for mv in move_history[len(board.move_stack):history_pointer]:
         board.push(mv)
+    refresh_position_cache()
+    dirty = True
+
+def append_history_text(move):
+    # only the last wrapped line (and any new ones) need to be re-rendered
+    global history_text
+    first_line = len(history_text) // HISTORY_WRAP
+    history_text = f"{history_text} {move.uci()}" if history_text else move.uci()
+    del history_line_surfs[first_line:]
+    for i in range(first_line * HISTORY_WRAP, len(history_text), HISTORY_WRAP):
+        history_line_surfs.append(SMALL_FONT.render(history_text[i:i+HISTORY_WRAP], True, (240,240,240)))
+
+def clear_history_text():
+    global history_text
+    history_text = ""
+    history_line_surfs.clear()
 
 def push_move_and_record(move):
-    global move_history, history_pointer
+    global move_history, history_pointer, dirty
     board.push(move)
     move_history.append(move)
     history_pointer = len(move_history)
+    append_history_text(move)
+    refresh_position_cache()
+    dirty = True
+
+def random_move(position):
+    # reservoir sampling: uniform pick without materialising the move list
+    chosen = None
+    for i, mv in enumerate(position.generate_legal_moves()):
+        if random.randrange(i + 1) == 0:
+            chosen = mv
+    return chosen
+
+def choose_ai_move(position, limit):
+    # runs on the executor thread; works on a copy so the GUI can keep using `board`
+    if engine:
+        # ponder=True keeps Stockfish searching the expected reply while the human thinks;
+        # python-chess turns a correct guess into a ponderhit on the next play()
+        res = engine.play(position, limit, ponder=True)
+        if res.move is not None:
+            return res.move
+    return random_move(position)
+
+def wake_event_loop(future):
+    try:
+        pygame.event.post(pygame.event.Event(AI_TICK_EVENT))
+    except pygame.error:
+        pass
 
 def ai_make_move():
-    global ai_is_thinking
-    if board.is_game_over():
+    global ai_is_thinking, ai_future, dirty
+    if position_outcome is not None:
         return
     ai_is_thinking = True
+    dirty = True
+    ai_future = ai_executor.submit(choose_ai_move, board.copy(), ai_limit)
+    ai_future.add_done_callback(wake_event_loop)
+
+def apply_ai_move():
+    global ai_is_thinking, ai_future, history_pointer, dirty
+    future = ai_future
+    ai_future = None
+    ai_is_thinking = False
+    dirty = True
+    # the search ran on the live position, so leave history view before pushing
+    if history_pointer != len(move_history):
+        history_pointer = len(move_history)
+        update_board_from_history()
     try:
-        if engine:
-            limit = chess.engine.Limit(time=time_per_move)
-            res = engine.play(board, limit)
-            best = res.move
-            if best is None:
-                best = random.choice(list(board.legal_moves))
-        else:
-            best = random.choice(list(board.legal_moves))
+        best = future.result()
+        if best not in legal_move_set:
+            best = random_move(board)
         push_move_and_record(best)
     except Exception as e:
         print("AI move error:", e)
         try:
-            mv = random.choice(list(board.legal_moves))
+            mv = random_move(board)
             push_move_and_record(mv)
         except Exception:
             pass
-    ai_is_thinking = False
 
 def is_light_square(sq):
     file = chess.square_file(sq)
     rank = chess.square_rank(sq)
     return (file + rank) % 2 == 0
 
-def draw_board():
-    WIN.fill((10,10,10))
-
-    for r in range(8):
-        for c in range(8):
-            x = c * SQUARE_SIZE
-            y = r * SQUARE_SIZE
-            color = LIGHT if (r + c) % 2 == 0 else DARK
-            pygame.draw.rect(WIN, color, (x, y, SQUARE_SIZE, SQUARE_SIZE))
+def render_board_frame(frame, last):
+    frame.blit(BOARD_BG, (0, 0))
 
    
-    if history_pointer > 0:
-        last = move_history[history_pointer - 1]
-        fx, fy = square_to_pixel(last.from_square)
-        tx, ty = square_to_pixel(last.to_square)
-        pygame.draw.rect(WIN, LAST_MOVE_COL, (fx, fy, SQUARE_SIZE, SQUARE_SIZE), 4)
-        pygame.draw.rect(WIN, LAST_MOVE_COL, (tx, ty, SQUARE_SIZE, SQUARE_SIZE), 4)
+    if last is not None:
+        frame.blits([(LAST_MOVE_FRAME, SQ_XY[last.from_square]), (LAST_MOVE_FRAME, SQ_XY[last.to_square])], doreturn=False)
 
     
     if selected_square is not None:
-        sx, sy = square_to_pixel(selected_square)
-        pygame.draw.rect(WIN, SELECT_COL, (sx, sy, SQUARE_SIZE, SQUARE_SIZE), 4)
-        for mv in legal_moves_for_sel:
-            tx, ty = square_to_pixel(mv.to_square)
-            pygame.draw.circle(WIN, HIGHLIGHT, (tx + SQUARE_SIZE//2, ty + SQUARE_SIZE//2), 10)
+        frame.blit(SELECT_FRAME, SQ_XY[selected_square])
+        frame.blits([(DOT, SQ_DOT_XY[mv.to_square]) for mv in legal_moves_for_sel], doreturn=False)
 
     
-    for sq in chess.SQUARES:
-        piece = board.piece_at(sq)
-        if piece:
-            x, y = square_to_pixel(sq)
-            color = 'w' if piece.color == chess.WHITE else 'b'
-            name = ''
-            if piece.piece_type == chess.PAWN: name = 'p'
-            elif piece.piece_type == chess.KNIGHT: name = 'n'
-            elif piece.piece_type == chess.BISHOP: name = 'b'
-            elif piece.piece_type == chess.ROOK: name = 'r'
-            elif piece.piece_type == chess.QUEEN: name = 'q'
-            elif piece.piece_type == chess.KING: name = 'k'
-            key = color + name
-            img = PIECE_IMAGES.get(key)
-            if img:
-                WIN.blit(img, (x, y))
+    # walk only the occupied squares of the bitboard instead of all 64
+    blit_list = []
+    for sq in chess.scan_forward(board.occupied):
+        img = SYMBOL_TO_IMAGE.get(board.piece_at(sq).symbol())
+        if img:
+            blit_list.append((img, SQ_XY[sq]))
+    frame.blits(blit_list, doreturn=False)
+
+def draw_board():
+    WIN.fill((10,10,10))
+
+    # the board area only depends on the position, last move and selection, so
+    # frames are kept per Zobrist key and reused when navigation lands on one again
+    last = move_history[history_pointer - 1] if history_pointer > 0 else None
+    key = (position_hash, last, selected_square)
+    frame = board_frame_cache.get(key)
+    if frame is None:
+        if len(board_frame_cache) >= BOARD_FRAME_CACHE_SIZE:
+            frame = board_frame_cache.pop(next(iter(board_frame_cache)))
+        else:
+            frame = pygame.Surface((BOARD_SIZE, BOARD_SIZE)).convert()
+        render_board_frame(frame, last)
+        board_frame_cache[key] = frame
+    WIN.blit(frame, (0, 0))
 
    
     pygame.draw.rect(WIN, (50,50,50), (0, BOARD_SIZE, BOARD_SIZE, INFO_HEIGHT))
     
    
-    status = "Your turn" if board.turn == human_color and not board.is_game_over() else ("AI thinking..." if ai_is_thinking else "AI's turn" if not board.is_game_over() else "Game over")
+    status = "Your turn" if board.turn == human_color and position_outcome is None else ("AI thinking..." if ai_is_thinking else "AI's turn" if position_outcome is None else "Game over")
     info_surf = SMALL_FONT.render(f"{status}", True, (230,230,230))
     WIN.blit(info_surf, (10, BOARD_SIZE + 5))
 
     
-    moves_text = " ".join([mv.uci() for mv in move_history])
-    moves_lines = [moves_text[i:i+80] for i in range(0, len(moves_text), 80)]  # wrap text
-    for idx, line in enumerate(moves_lines):
-        line_surf = SMALL_FONT.render(line, True, (240,240,240))
-        WIN.blit(line_surf, (10, BOARD_SIZE + 30 + idx*20))
+    WIN.blits([(line_surf, (10, BOARD_SIZE + 30 + idx*20)) for idx, line_surf in enumerate(history_line_surfs)], doreturn=False)
 
   
-    if board.is_game_over():
-        res = board.result()
+    if position_outcome is not None:
+        res = position_outcome.result()
         text = "Draw" if res == "1/2-1/2" else ("White wins" if res == "1-0" else "Black wins")
         res_surf = FONT.render(f"Game Over: {text}", True, RESULT_COL)
         rect = res_surf.get_rect(center=(BOARD_SIZE//2, BOARD_SIZE + INFO_HEIGHT//2))
@@ -212,26 +317,36 @@ def draw_board():
 
 
 def main():
-    global selected_square, legal_moves_for_sel, last_player_move_time, history_pointer, move_history, board, ai_is_thinking
-    clock = pygame.time.Clock()
+    global selected_square, selected_piece, legal_moves_for_sel, last_player_move_time, history_pointer, move_history, board, ai_is_thinking, ai_future, dirty
     running = True
+    refresh_position_cache()
 
     print("Controls: Click a piece to select, click destination to move.")
     print("Arrow keys: ← back  → forward  ↓ jump to live. Press R to reset. Ctrl+C to quit.")
 
     while running:
-        clock.tick(FPS)
-        draw_board()
+        if ai_future is not None and ai_future.done():
+            apply_ai_move()
 
-        if not board.is_game_over() and board.turn != human_color and last_player_move_time is not None:
+        if position_outcome is None and history_pointer == len(move_history) and board.turn != human_color and last_player_move_time is not None:
             if time.time() - last_player_move_time >= 1 and not ai_is_thinking:
                 ai_make_move()
                 last_player_move_time = None
+                pygame.time.set_timer(AI_TICK_EVENT, 0)
+
+        if dirty:
+            draw_board()
+            dirty = False
 
-        for event in pygame.event.get():
+        # block until input arrives (or the AI tick fires) instead of polling every frame
+        events = [pygame.event.wait(EVENT_WAIT_MS)] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
 
+            elif event.type == pygame.VIDEOEXPOSE:
+                dirty = True
+
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_LEFT:
                     if history_pointer > 0:
@@ -245,12 +360,21 @@ def main():
                     history_pointer = len(move_history)
                     update_board_from_history()
                 elif event.key == pygame.K_r:
+                    if ai_future is not None:
+                        ai_future.cancel()
+                        ai_future = None
+                        ai_is_thinking = False
                     board.reset()
+                    refresh_position_cache()
                     move_history = []
+                    clear_history_text()
                     history_pointer = 0
                     selected_square = None
+                    selected_piece = None
                     legal_moves_for_sel = []
                     last_player_move_time = None
+                    pygame.time.set_timer(AI_TICK_EVENT, 0)
+                    dirty = True
                     print("Board reset.")
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -261,7 +385,7 @@ def main():
                     history_pointer = len(move_history)
                     update_board_from_history()
 
-                if board.is_game_over():
+                if position_outcome is not None:
                     continue
 
                 clicked_sq = pixel_to_square((mx, my))
@@ -272,23 +396,30 @@ def main():
                     piece = board.piece_at(clicked_sq)
                     if piece and piece.color == human_color and board.turn == human_color:
                         selected_square = clicked_sq
-                        legal_moves_for_sel = [mv for mv in board.legal_moves if mv.from_square == selected_square]
+                        selected_piece = piece
+                        legal_moves_for_sel = legal_moves_by_from.get(selected_square, [])
+                        dirty = True
                 else:
                     mv = chess.Move(selected_square, clicked_sq)
-                    if mv not in board.legal_moves:
-                        if (board.piece_at(selected_square) and board.piece_at(selected_square).piece_type == chess.PAWN):
-                            mvq = chess.Move(selected_square, clicked_sq, promotion=chess.QUEEN)
-                            if mvq in board.legal_moves:
-                                mv = mvq
-                    if mv in board.legal_moves and board.turn == human_color:
+                    if mv not in legal_move_set and selected_piece.piece_type == chess.PAWN:
+                        # a pawn move that is only legal as a promotion; auto-queen it
+                        mv = chess.Move(selected_square, clicked_sq, promotion=chess.QUEEN)
+                    if mv in legal_move_set and board.turn == human_color:
                         push_move_and_record(mv)
                         selected_square = None
+                        selected_piece = None
                         legal_moves_for_sel = []
-                        last_player_move_time = time.time()
+                        # a game-ending move leaves nothing for the AI, so don't start the tick timer
+                        if position_outcome is None:
+                            last_player_move_time = time.time()
+                            pygame.time.set_timer(AI_TICK_EVENT, AI_TICK_MS)
                     else:
                         selected_square = None
+                        selected_piece = None
                         legal_moves_for_sel = []
+                        dirty = True
 
+    ai_executor.shutdown(wait=False, cancel_futures=True)
     pygame.quit()
     if engine:
         try:
@@ -302,6 +433,7 @@ if __name__ == "__main__":
         main()
     except KeyboardInterrupt:
         print("Interrupted by user. Exiting.")
+        ai_executor.shutdown(wait=False, cancel_futures=True)
         pygame.quit()
         if engine:
             try: